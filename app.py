@@ -1,3 +1,10 @@
+import json
+import os
+from bisect import bisect_left
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
 import streamlit as st
 import pandas as pd
 import plotly.express as px
@@ -14,13 +21,20 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
-GEOJSON_URL = "https://raw.githubusercontent.com/martinjc/UK-GeoJSON/master/json/administrative/gb/lad.json"
+# GEOJSON_URL may point to a local file instead (e.g. the offline stand-in used by loadtest.py)
+GEOJSON_URL = os.environ.get(
+    "GEOJSON_URL",
+    "https://raw.githubusercontent.com/martinjc/UK-GeoJSON/master/json/administrative/gb/lad.json"
+)
 
 # --- CACHE GEOJSON DATA ---
 @st.cache_data(ttl=3600)  # Cache for 1 hour
 def load_geojson():
     """Load and cache GeoJSON data to avoid repeated fetches"""
     try:
+        if not GEOJSON_URL.startswith(('http://', 'https://')):
+            with open(GEOJSON_URL, encoding='utf-8') as f:
+                return json.load(f)
         response = requests.get(GEOJSON_URL, timeout=10)
         response.raise_for_status()
         return response.json()
@@ -47,6 +61,277 @@ def get_map_data(master_df, category_filter, selected_year):
     
     return map_data
 
+# --- TIME-SERIES ANALYTICS ---
+YEARS = [str(y) for y in range(2025, 2051)]
+
+def compute_growth_metrics(values):
+    """Vectorized growth metrics for a (n_series, n_years) array of annual benefits"""
+    values = np.atleast_2d(np.asarray(values, dtype=float))
+    start, end = values[:, 0], values[:, -1]
+    n_periods = values.shape[1] - 1
+
+    # CAGR is only defined when both endpoints are positive
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cagr = np.where(
+            (start > 0) & (end > 0),
+            (end / start) ** (1 / n_periods) - 1,
+            np.nan
+        ) * 100
+
+    peak_idx = values.argmax(axis=1)
+    yoy = np.diff(values, axis=1)
+
+    return {
+        'start': start,
+        'end': end,
+        'cagr': cagr,
+        'peak_year': np.asarray(YEARS, dtype=int)[peak_idx],
+        'peak_value': values[np.arange(len(values)), peak_idx],
+        'cumulative': values.cumsum(axis=1),
+        'yoy': yoy,
+    }
+
+@st.cache_data
+def get_timeseries_stats(master_df):
+    """Cache growth metrics for every local authority x co-benefit type (plus 'all' totals per LA)"""
+    by_type = master_df.groupby(['co-benefit_type', 'local_authority'])[YEARS].sum()
+    by_la = by_type.groupby(level='local_authority').sum()
+    by_la.index = pd.MultiIndex.from_product(
+        [['all'], by_la.index], names=['co-benefit_type', 'local_authority']
+    )
+    series = pd.concat([by_type, by_la])
+
+    # Single vectorized pass over the year columns of every series
+    metrics = compute_growth_metrics(series.to_numpy())
+
+    stats = pd.DataFrame({
+        'start': metrics['start'],
+        'end': metrics['end'],
+        'total': metrics['cumulative'][:, -1],
+        'cagr': metrics['cagr'],
+        'peak_year': metrics['peak_year'],
+        'peak_value': metrics['peak_value'],
+        'mean_yoy': metrics['yoy'].mean(axis=1),
+        'max_yoy': metrics['yoy'].max(axis=1),
+    }, index=series.index)
+    cumulative = pd.DataFrame(metrics['cumulative'], index=series.index,
+                              columns=[f'cum_{y}' for y in YEARS])
+    yoy = pd.DataFrame(metrics['yoy'], index=series.index,
+                       columns=[f'yoy_{y}' for y in YEARS[1:]])
+
+    return pd.concat([stats, cumulative, yoy], axis=1).sort_index()
+
+# --- PLACE SEARCH INDEX ---
+PLACE_KINDS = {
+    'nation': 'Nation',
+    'local_authority': 'Local Authority',
+    'small_area': 'Small Area',
+}
+FUZZY_MIN_SIMILARITY = 0.5
+
+def normalize_query(text):
+    """Lower-case and collapse whitespace so index keys and queries compare equally"""
+    return ' '.join(str(text).lower().split())
+
+def key_trigrams(key):
+    """Distinct trigrams of each word in a key, padded so word starts and ends count as well"""
+    padded = [f'  {word} ' for word in key.split()]
+    return dict.fromkeys(word[j:j + 3] for word in padded for j in range(len(word) - 2))
+
+def build_search_index(lookups):
+    """Build prefix (sorted keys + binary search) and trigram indexes over place names"""
+    areas = lookups[['small_area', 'local_authority']].dropna(subset=['small_area']).drop_duplicates('small_area')
+    places = {
+        'nation': [(name, None) for name in lookups['nation'].dropna().unique()],
+        'local_authority': [(name, name) for name in lookups['local_authority'].dropna().unique()],
+        'small_area': list(areas.itertuples(index=False, name=None)),
+    }
+
+    # Entries are stored kind by kind, alphabetically within each kind, so entry ids
+    # double as result rank and every posting list below is already in rank order
+    entries, keys, prefix = [], [], {}
+    for kind, rows in places.items():
+        kind_entries = sorted((normalize_query(label), label, la) for label, la in rows)
+        prefix[kind] = (len(keys), [key for key, _, _ in kind_entries])
+        for key, label, la in kind_entries:
+            keys.append(key)
+            entries.append({'label': label, 'kind': kind, 'local_authority': la})
+
+    trigrams = defaultdict(list)
+    gram_counts = np.empty(len(keys))
+    for i, key in enumerate(keys):
+        grams = key_trigrams(key)
+        gram_counts[i] = len(grams)
+        for gram in grams:
+            trigrams[gram].append(i)
+
+    return {
+        'entries': entries, 'keys': keys, 'prefix': prefix,
+        'trigrams': dict(trigrams), 'gram_counts': gram_counts,
+    }
+
+def search_places(index, query, limit=10):
+    """Typeahead lookup: prefix matches first (nations, LAs, small areas), then substring, then fuzzy matches"""
+    q = normalize_query(query)
+    if not q:
+        return []
+
+    hits = []
+    for kind in PLACE_KINDS:
+        offset, sorted_keys = index['prefix'][kind]
+        lo = bisect_left(sorted_keys, q)
+        hi = min(bisect_left(sorted_keys, q + '\uffff', lo), lo + limit - len(hits))
+        hits.extend(range(offset + lo, offset + hi))
+        if len(hits) >= limit:
+            return [index['entries'][i] for i in hits]
+
+    if len(q) < 3:
+        return [index['entries'][i] for i in hits]
+
+    # Fall back to substring matches: scan the shortest trigram posting list in rank order
+    # (only trigrams inside a word are indexed, so those are the ones every match must contain)
+    inner_grams = [word[j:j + 3] for word in q.split() for j in range(len(word) - 2)]
+    keys = index['keys']
+    if inner_grams:
+        postings = min((index['trigrams'].get(gram, []) for gram in inner_grams), key=len)
+        seen = set(hits)
+        for i in postings:
+            if i not in seen and q in keys[i]:
+                hits.append(i)
+                if len(hits) >= limit:
+                    return [index['entries'][i] for i in hits]
+
+    # Then fuzzy matches for misspellings: rank by the share of the query's trigrams found in
+    # the name, breaking ties by trigram (Jaccard) similarity so closer names come first
+    grams = key_trigrams(q)
+    postings = [index['trigrams'][gram] for gram in grams if gram in index['trigrams']]
+    if postings:
+        shared = np.bincount(np.concatenate(postings), minlength=len(keys))
+        coverage = shared / len(grams)
+        coverage[hits] = 0
+        candidates = np.flatnonzero(coverage >= FUZZY_MIN_SIMILARITY)
+        jaccard = shared[candidates] / (len(grams) + index['gram_counts'][candidates] - shared[candidates])
+        ranked = candidates[np.lexsort((-jaccard, -coverage[candidates]))]
+        hits.extend(ranked[:limit - len(hits)].tolist())
+
+    return [index['entries'][i] for i in hits]
+
+@st.cache_resource
+def get_search_index():
+    """Build the place search index once per server process"""
+    return build_search_index(load_lookups())
+
+@st.cache_data
+def get_place_aggregates(master_df):
+    """Cache total benefits by co-benefit type for every nation, local authority and small area"""
+    aggregates = {}
+    for kind in PLACE_KINDS:
+        totals = master_df.groupby([kind, 'co-benefit_type'])['sum'].sum().unstack(fill_value=0)
+        totals['total'] = totals.sum(axis=1)
+        aggregates[kind] = totals
+    return aggregates
+
+# --- APPROXIMATE QUERIES (STRATIFIED SAMPLE + BACKGROUND EXACT REFINEMENT) ---
+SAMPLE_FRACTION = 0.1
+MIN_SAMPLE_PER_STRATUM = 2
+STRATA = ['nation', 'local_authority']
+MAX_EXACT_RESULTS = 128
+EXACT_POLL_SECONDS = 0.25
+
+@st.cache_data
+def get_stratified_sample(master_df, fraction=SAMPLE_FRACTION, seed=42):
+    """Cache a stratified random sample of small areas (strata = nation x local authority)"""
+    areas = master_df[['small_area'] + STRATA].drop_duplicates('small_area').fillna(
+        {col: 'Unknown' for col in STRATA}
+    )
+    shuffled = areas.iloc[np.random.default_rng(seed).permutation(len(areas))]
+
+    strata_groups = shuffled.groupby(STRATA)
+    stratum_size = strata_groups['small_area'].transform('size')
+    take = np.minimum(stratum_size, np.maximum(MIN_SAMPLE_PER_STRATUM, np.ceil(stratum_size * fraction)))
+    sampled_areas = shuffled[strata_groups.cumcount() < take]
+
+    strata = pd.DataFrame({
+        'N': areas.groupby(STRATA).size(),
+        'n': sampled_areas.groupby(STRATA).size(),
+    })
+
+    return {
+        'areas': sampled_areas.reset_index(drop=True),
+        'rows': master_df[master_df['small_area'].isin(sampled_areas['small_area'])],
+        'strata': strata,
+        'population_range': (float(master_df['population'].min()), float(master_df['population'].max())),
+    }
+
+def filter_rows(df, filters):
+    """Boolean mask for an ad-hoc slice (nations, LAs, categories, damage type, population)"""
+    mask = pd.Series(True, index=df.index)
+    # None means the full population range, which also keeps small areas without a lookups match
+    if filters['population'] is not None:
+        mask &= df['population'].between(*filters['population'])
+    if filters['nations']:
+        mask &= df['nation'].isin(filters['nations'])
+    if filters['local_authorities']:
+        mask &= df['local_authority'].isin(filters['local_authorities'])
+    if filters['categories']:
+        mask &= df['co-benefit_type'].isin(filters['categories'])
+    if filters['damage_type']:
+        mask &= df['damage_type'] == filters['damage_type']
+    return mask
+
+def slice_year_columns(filters):
+    start, end = filters['years']
+    return [str(y) for y in range(start, end + 1)]
+
+def estimate_slice(sample, filters, z=1.96):
+    """Stratified estimate of a slice total and its confidence half-width"""
+    rows = sample['rows']
+    mask = filter_rows(rows, filters)
+    area_totals = rows.loc[mask, slice_year_columns(filters)].sum(axis=1).groupby(rows.loc[mask, 'small_area']).sum()
+
+    # Only strata selected by the nation/LA filters contribute; other filters act as a domain (y = 0)
+    areas = sample['areas']
+    in_strata = np.ones(len(areas), dtype=bool)
+    if filters['nations']:
+        in_strata &= areas['nation'].isin(filters['nations'])
+    if filters['local_authorities']:
+        in_strata &= areas['local_authority'].isin(filters['local_authorities'])
+    areas = areas[in_strata]
+    if areas.empty:
+        return 0.0, 0.0
+
+    y = area_totals.reindex(areas['small_area']).fillna(0).to_numpy()
+    per_stratum = pd.Series(y).groupby([areas[col].to_numpy() for col in STRATA]).agg(['mean', 'var'])
+    strata = sample['strata'].loc[per_stratum.index]
+
+    N, n = strata['N'].to_numpy(), strata['n'].to_numpy()
+    total = float((N * per_stratum['mean']).sum())
+    variance = float((N ** 2 * (1 - n / N) * per_stratum['var'].fillna(0) / n).sum())
+    return total, z * np.sqrt(variance)
+
+def compute_exact_slice(master_df, filters):
+    """Full scan of master_df for an ad-hoc slice"""
+    mask = filter_rows(master_df, filters)
+    return float(master_df.loc[mask, slice_year_columns(filters)].to_numpy().sum())
+
+@st.cache_resource
+def get_exact_query_pool():
+    """Background workers and a small result cache shared by all sessions"""
+    return {'executor': ThreadPoolExecutor(max_workers=2), 'futures': OrderedDict(), 'lock': Lock()}
+
+def submit_exact_slice(master_df, filters):
+    """Start (or reuse) the background exact computation for a slice"""
+    pool = get_exact_query_pool()
+    key = tuple(filters.items())
+    with pool['lock']:
+        futures = pool['futures']
+        if key not in futures:
+            futures[key] = pool['executor'].submit(compute_exact_slice, master_df, filters)
+            while len(futures) > MAX_EXACT_RESULTS:
+                futures.popitem(last=False)
+        futures.move_to_end(key)
+        return futures[key]
+
 # CSS for the landing page and dashboard (dark, modern & consistent theme)
 st.markdown("""
 <style>
@@ -199,13 +484,18 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # --- LOAD DATA ---
+@st.cache_data
+def load_lookups():
+    lk = pd.read_csv('lookups.csv', sep=None, engine='python', encoding='utf-8')
+    lk.columns = lk.columns.str.replace('^\ufeff', '', regex=True).str.strip()
+    return lk
+
 @st.cache_data
 def load_data():
     l3 = pd.read_csv('Level_3.csv', sep=None, engine='python', encoding='utf-8')
-    lk = pd.read_csv('lookups.csv', sep=None, engine='python', encoding='utf-8')
+    lk = load_lookups()
     
     l3.columns = l3.columns.str.replace('^\ufeff', '', regex=True).str.strip()
-    lk.columns = lk.columns.str.replace('^\ufeff', '', regex=True).str.strip()
     
     target = ['air_quality', 'physical_activity', 'road_safety', 'noise', 'congestion']
     l3 = l3[l3['co-benefit_type'].isin(target)].copy()
@@ -343,159 +633,166 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
+# Category filter options (shared by the map, growth and explorer sections)
+benefit_categories = {
+    'All Co-benefits': None,
+    'Air Quality': 'air_quality',
+    'Physical Activity': 'physical_activity',
+    'Road Safety': 'road_safety',
+    'Noise': 'noise',
+    'Congestion': 'congestion'
+}
+
+# Interactive sections are fragments: a widget change reruns only its own section,
+# so e.g. a year-slider tick no longer rebuilds the static charts further down.
+
 # === SECTION 1: INTERACTIVE MAP VIEW ===
 st.markdown('<div id="rq1"></div>', unsafe_allow_html=True)
 st.markdown("## 🗺️ Interactive Map: Spatial Distribution of Co-benefits")
 
-col_map1, col_map2 = st.columns([3, 1])
+@st.fragment
+def render_map_section():
+    col_map1, col_map2 = st.columns([3, 1])
 
-with col_map2:
-    st.markdown("### Filter Options")
-    
-    # Category filter
-    benefit_categories = {
-        'All Co-benefits': None,
-        'Air Quality': 'air_quality',
-        'Physical Activity': 'physical_activity',
-        'Road Safety': 'road_safety',
-        'Noise': 'noise',
-        'Congestion': 'congestion'
-    }
-    
-    selected_category = st.selectbox(
-        "Select Benefit Category:",
-        options=list(benefit_categories.keys())
+    with col_map2:
+        st.markdown("### Filter Options")
+        
+        selected_category = st.selectbox(
+            "Select Benefit Category:",
+            options=list(benefit_categories.keys())
+        )
+        
+        # Time slider
+        selected_year = st.slider(
+            "Select Year:",
+            min_value=2025,
+            max_value=2050,
+            value=2050,
+            step=1
+        )
+        
+        st.markdown(f"""
+        <div class="insight-box" style="margin-top: 2rem;">
+            <strong>📊 Current Selection:</strong><br>
+            Category: <strong>{selected_category}</strong><br>
+            Year: <strong>{selected_year}</strong>
+        </div>
+        """, unsafe_allow_html=True)
+
+    with col_map1:
+        # Initialize session state for map view persistence
+        if 'map_center' not in st.session_state:
+            st.session_state.map_center = [54.5, -2]
+            st.session_state.map_zoom = 5
+            st.session_state.last_filter = None
+        
+        # Check if filter has changed
+        current_filter = f"{selected_category}_{selected_year}"
+        filter_changed = st.session_state.last_filter != current_filter
+        
+        # Get cached map data aggregation (fast even on re-runs)
+        category_filter = benefit_categories[selected_category]
+        map_data = get_map_data(master_df, category_filter, selected_year)
+        
+        # Calculate national average for comparison
+        national_avg = map_data['value'].mean()
+        
+        # Load cached GeoJSON data
+        geojson_data = load_geojson()
+        
+        if geojson_data is None:
+            st.warning("⚠️ GeoJSON data could not be loaded. Showing the top 10 areas in a table instead.")
+            st.dataframe(map_data.nlargest(10, 'value'), width='stretch')
+        else:
+            try:
+                # Get current map view state (preserved from previous interactions)
+                map_location = st.session_state.map_center
+                map_zoom = st.session_state.map_zoom
+                
+                # Create map with current view state
+                m_map = folium.Map(
+                    location=map_location, 
+                    zoom_start=map_zoom, 
+                    tiles="CartoDB dark_matter"
+                )
+                
+                # Always add choropleth (data aggregation is cached, so it's fast)
+                # The choropleth will update when filter changes because map_data changes
+                folium.Choropleth(
+                    geo_data=geojson_data,
+                    data=map_data,  # This uses cached aggregation from get_map_data()
+                    columns=['local_authority', 'value'],
+                    key_on="feature.properties.LAD13NM",
+                    fill_color="YlGn",
+                    fill_opacity=0.8,
+                    line_opacity=0.2,
+                    legend_name="Benefits (Million GBP)"
+                ).add_to(m_map)
+                
+                # Use key based on filter to ensure choropleth updates when filter changes
+                # But preserve view state from session_state to maintain zoom/pan
+                # The data aggregation is cached, so recreating choropleth is fast
+                map_key = f"map_{current_filter}"
+                
+                map_return = st_folium(
+                    m_map, 
+                    width=None, 
+                    height=600, 
+                    key=map_key,  # Key changes with filter to ensure choropleth updates
+                    returned_objects=["last_clicked", "bounds", "zoom", "center"]
+                )
+                
+                # Update session state with current map view state
+                # This preserves zoom/pan position
+                if map_return is not None:
+                    if map_return.get('center') is not None:
+                        st.session_state.map_center = [
+                            map_return['center']['lat'],
+                            map_return['center']['lng']
+                        ]
+                    if map_return.get('zoom') is not None:
+                        st.session_state.map_zoom = map_return['zoom']
+                
+                # Update filter state for tracking
+                if filter_changed:
+                    st.session_state.last_filter = current_filter
+                
+            except Exception as e:
+                st.warning(f"⚠️ The map could not be loaded. Showing the top 10 areas in a table instead. Details: {e}")
+                st.dataframe(map_data.nlargest(10, 'value'), width='stretch')
+
+    # Top 10 regions
+    st.markdown("### 🏆 Top 10 Regions by Benefits")
+    top10 = map_data.nlargest(10, 'value')
+    top10['Comparison to Avg'] = ((top10['value'] / national_avg - 1) * 100).round(1)
+
+    fig_top10 = px.bar(
+        top10, x='value', y='local_authority',
+        orientation='h',
+        color='value',
+        color_continuous_scale='Viridis',
+        labels={'value': 'Benefits (Million GBP)', 'local_authority': ''},
+        text='value'
     )
-    
-    # Time slider
-    selected_year = st.slider(
-        "Select Year:",
-        min_value=2025,
-        max_value=2050,
-        value=2050,
-        step=1
+    fig_top10.update_traces(texttemplate='£%{text:.1f}M', textposition='outside')
+    fig_top10.update_layout(
+        showlegend=False,
+        height=400,
+        yaxis={'categoryorder': 'total ascending'}
     )
-    
+    st.plotly_chart(fig_top10, width='stretch')
+
     st.markdown(f"""
-    <div class="insight-box" style="margin-top: 2rem;">
-        <strong>📊 Current Selection:</strong><br>
-        Category: <strong>{selected_category}</strong><br>
-        Year: <strong>{selected_year}</strong>
+    <div class="insight-box">
+        <strong>💡 Answer to Research Question 1:</strong><br>
+        The largest co-benefits are concentrated in major urban areas such as <strong>{top10.iloc[0]['local_authority']}</strong> 
+        (around £{top10.iloc[0]['value']:.1f} million), which is approximately <strong>{top10.iloc[0]['Comparison to Avg']:.0f}%</strong> 
+        above the national average. However, benefits are spread across all {len(map_data)} local authorities, 
+        which shows opportunities for sustainable transport policies across the country.
     </div>
     """, unsafe_allow_html=True)
 
-with col_map1:
-    # Initialize session state for map view persistence
-    if 'map_center' not in st.session_state:
-        st.session_state.map_center = [54.5, -2]
-        st.session_state.map_zoom = 5
-        st.session_state.last_filter = None
-    
-    # Check if filter has changed
-    current_filter = f"{selected_category}_{selected_year}"
-    filter_changed = st.session_state.last_filter != current_filter
-    
-    # Get cached map data aggregation (fast even on re-runs)
-    category_filter = benefit_categories[selected_category]
-    map_data = get_map_data(master_df, category_filter, selected_year)
-    
-    # Calculate national average for comparison
-    national_avg = map_data['value'].mean()
-    
-    # Load cached GeoJSON data
-    geojson_data = load_geojson()
-    
-    if geojson_data is None:
-        st.warning("⚠️ GeoJSON data could not be loaded. Showing the top 10 areas in a table instead.")
-        st.dataframe(map_data.nlargest(10, 'value'), width='stretch')
-    else:
-        try:
-            # Get current map view state (preserved from previous interactions)
-            map_location = st.session_state.map_center
-            map_zoom = st.session_state.map_zoom
-            
-            # Create map with current view state
-            m_map = folium.Map(
-                location=map_location, 
-                zoom_start=map_zoom, 
-                tiles="CartoDB dark_matter"
-            )
-            
-            # Always add choropleth (data aggregation is cached, so it's fast)
-            # The choropleth will update when filter changes because map_data changes
-            folium.Choropleth(
-                geo_data=geojson_data,
-                data=map_data,  # This uses cached aggregation from get_map_data()
-                columns=['local_authority', 'value'],
-                key_on="feature.properties.LAD13NM",
-                fill_color="YlGn",
-                fill_opacity=0.8,
-                line_opacity=0.2,
-                legend_name="Benefits (Million GBP)"
-            ).add_to(m_map)
-            
-            # Use key based on filter to ensure choropleth updates when filter changes
-            # But preserve view state from session_state to maintain zoom/pan
-            # The data aggregation is cached, so recreating choropleth is fast
-            map_key = f"map_{current_filter}"
-            
-            map_return = st_folium(
-                m_map, 
-                width=None, 
-                height=600, 
-                key=map_key,  # Key changes with filter to ensure choropleth updates
-                returned_objects=["last_clicked", "bounds", "zoom", "center"]
-            )
-            
-            # Update session state with current map view state
-            # This preserves zoom/pan position
-            if map_return is not None:
-                if map_return.get('center') is not None:
-                    st.session_state.map_center = [
-                        map_return['center']['lat'],
-                        map_return['center']['lng']
-                    ]
-                if map_return.get('zoom') is not None:
-                    st.session_state.map_zoom = map_return['zoom']
-            
-            # Update filter state for tracking
-            if filter_changed:
-                st.session_state.last_filter = current_filter
-            
-        except Exception as e:
-            st.warning(f"⚠️ The map could not be loaded. Showing the top 10 areas in a table instead. Details: {e}")
-            st.dataframe(map_data.nlargest(10, 'value'), width='stretch')
-
-# Top 10 regions
-st.markdown("### 🏆 Top 10 Regions by Benefits")
-top10 = map_data.nlargest(10, 'value')
-top10['Comparison to Avg'] = ((top10['value'] / national_avg - 1) * 100).round(1)
-
-fig_top10 = px.bar(
-    top10, x='value', y='local_authority',
-    orientation='h',
-    color='value',
-    color_continuous_scale='Viridis',
-    labels={'value': 'Benefits (Million GBP)', 'local_authority': ''},
-    text='value'
-)
-fig_top10.update_traces(texttemplate='£%{text:.1f}M', textposition='outside')
-fig_top10.update_layout(
-    showlegend=False,
-    height=400,
-    yaxis={'categoryorder': 'total ascending'}
-)
-st.plotly_chart(fig_top10, width='stretch')
-
-st.markdown(f"""
-<div class="insight-box">
-    <strong>💡 Answer to Research Question 1:</strong><br>
-    The largest co-benefits are concentrated in major urban areas such as <strong>{top10.iloc[0]['local_authority']}</strong> 
-    (around £{top10.iloc[0]['value']:.1f} million), which is approximately <strong>{top10.iloc[0]['Comparison to Avg']:.0f}%</strong> 
-    above the national average. However, benefits are spread across all {len(map_data)} local authorities, 
-    which shows opportunities for sustainable transport policies across the country.
-</div>
-""", unsafe_allow_html=True)
+render_map_section()
 
 # === SECTION 2: BENEFIT TYPES ANALYSIS ===
 st.markdown('<div id="rq3"></div>', unsafe_allow_html=True)
@@ -552,8 +849,7 @@ st.markdown(f"""
 st.markdown('<div id="rq4"></div>', unsafe_allow_html=True)
 st.markdown("## 📈 Timeline: How Benefits Grow from 2025–2050")
 
-years = [str(y) for y in range(2025, 2051)]
-trend_df = master_df.groupby('co-benefit_type')[years].sum().T
+trend_df = master_df.groupby('co-benefit_type')[YEARS].sum().T
 trend_df.index = trend_df.index.astype(int)
 trend_df = trend_df.reset_index()
 trend_df.columns = ['Year'] + [col.replace('_', ' ').title() for col in trend_df.columns[1:]]
@@ -577,10 +873,11 @@ fig_timeline.update_layout(
 )
 st.plotly_chart(fig_timeline, width='stretch')
 
-# Growth calculation
-start_val = trend_df[trend_df['Year']==2025].iloc[0, 1:].sum()
-end_val = trend_df[trend_df['Year']==2050].iloc[0, 1:].sum()
-growth_rate = ((end_val/start_val)**(1/25) - 1) * 100
+# Growth calculation (national totals)
+national_growth = compute_growth_metrics(trend_df.iloc[:, 1:].sum(axis=1).to_numpy())
+start_val = national_growth['start'][0]
+end_val = national_growth['end'][0]
+growth_rate = national_growth['cagr'][0]
 
 st.markdown(f"""
 <div class="insight-box">
@@ -592,6 +889,59 @@ st.markdown(f"""
 </div>
 """, unsafe_allow_html=True)
 
+# Fastest growing areas (served from the cached per-LA growth table)
+st.markdown("### 🚀 Fastest Growing Areas")
+
+@st.fragment
+def render_fastest_growing():
+    timeseries_stats = get_timeseries_stats(master_df)
+
+    growth_sort_options = {
+        'Compound Annual Growth (%)': 'cagr',
+        'Largest Year-on-year Increase': 'max_yoy',
+        'Average Year-on-year Change': 'mean_yoy',
+        'Total Benefits 2025–2050': 'total',
+    }
+
+    col_growth1, col_growth2, col_growth3 = st.columns(3)
+    with col_growth1:
+        growth_category = st.selectbox(
+            "Benefit Category:",
+            options=list(benefit_categories.keys()),
+            key='growth_category'
+        )
+    with col_growth2:
+        growth_sort = st.selectbox(
+            "Rank By:",
+            options=list(growth_sort_options.keys()),
+            key='growth_sort'
+        )
+    with col_growth3:
+        growth_top_n = st.slider("Number of Areas:", min_value=5, max_value=50, value=15, step=5)
+
+    growth_view = timeseries_stats.xs(benefit_categories[growth_category] or 'all', level='co-benefit_type')
+    growth_view = growth_view.nlargest(growth_top_n, growth_sort_options[growth_sort])[
+        ['cagr', 'start', 'end', 'total', 'peak_year', 'max_yoy']
+    ].reset_index()
+    growth_view.columns = ['Local Authority', 'CAGR (%)', '2025 (£M)', '2050 (£M)',
+                           'Total (£M)', 'Peak Year', 'Max YoY Increase (£M)']
+
+    st.dataframe(
+        growth_view,
+        width='stretch',
+        hide_index=True,
+        column_config={
+            'CAGR (%)': st.column_config.NumberColumn(format='%.2f'),
+            '2025 (£M)': st.column_config.NumberColumn(format='%.2f'),
+            '2050 (£M)': st.column_config.NumberColumn(format='%.2f'),
+            'Total (£M)': st.column_config.NumberColumn(format='%.1f'),
+            'Peak Year': st.column_config.NumberColumn(format='%d'),
+            'Max YoY Increase (£M)': st.column_config.NumberColumn(format='%.3f'),
+        }
+    )
+
+render_fastest_growing()
+
 # === SECTION 4: HEALTH-EMISSION CORRELATION ===
 st.markdown('<div id="rq2"></div>', unsafe_allow_html=True)
 st.markdown("## 🔗 Links Between Health and Non-health Benefits")
@@ -656,48 +1006,177 @@ Compare co-benefits between two local authorities to understand regional differe
 </p>
 """, unsafe_allow_html=True)
 
-col_comp1, col_comp2 = st.columns(2)
+place_aggregates = get_place_aggregates(master_df)
 
-cities = sorted(master_df['local_authority'].unique())
+cities = place_aggregates['local_authority'].index.tolist()
 
-with col_comp1:
-    city_a = st.selectbox("Choose First City:", cities, index=0, key='city_select_a')
+# Place search (typeahead over nations, local authorities and small-area codes)
+st.markdown("### 🔎 Find an Area")
 
-with col_comp2:
-    city_b = st.selectbox("Choose Second City:", cities, 
-                          index=min(1, len(cities)-1), key='city_select_b')
+@st.fragment
+def render_place_search():
+    # st.text_input only reruns on Enter or blur, so this is search-on-submit: a name prefix,
+    # partial code or misspelt name is enough, and the matches below narrow to the right area
+    search_query = st.text_input(
+        "Search by local authority, small area code or nation:",
+        key='place_search',
+        placeholder="e.g. Leeds, S01006506, Wales",
+        help="Type a name, code or part of one and press Enter."
+    )
+    search_results = search_places(get_search_index(), search_query)
+
+    if search_query and not search_results:
+        st.info(f"No areas match \"{search_query}\".")
+    elif search_results:
+        selected_place = st.selectbox(
+            "Matching Areas:",
+            options=search_results,
+            format_func=lambda entry: (
+                f"{entry['label']} · {PLACE_KINDS[entry['kind']]}"
+                + (f" ({entry['local_authority']})" if entry['kind'] == 'small_area' else "")
+            ),
+            key='place_search_result'
+        )
+        place_totals = place_aggregates[selected_place['kind']]
+
+        if selected_place['label'] not in place_totals.index:
+            st.info(f"No co-benefit data available for {selected_place['label']}.")
+        else:
+            place_row = place_totals.loc[selected_place['label']]
+            place_categories = [c for c in place_totals.columns if c != 'total']
+            place_cols = st.columns(len(place_categories) + 1)
+            with place_cols[0]:
+                st.metric("Total", f"£{place_row['total']:.2f}M")
+            for col, category in zip(place_cols[1:], place_categories):
+                with col:
+                    st.metric(category.replace('_', ' ').title(), f"£{place_row[category]:.2f}M")
+
+render_place_search()
+
+@st.fragment
+def render_city_comparison():
+    col_comp1, col_comp2 = st.columns(2)
+
+    with col_comp1:
+        city_a = st.selectbox("Choose First City:", cities, index=0, key='city_select_a')
+
+    with col_comp2:
+        city_b = st.selectbox("Choose Second City:", cities, 
+                              index=min(1, len(cities)-1), key='city_select_b')
+
+    # Comparison data
+    comp_df = master_df[master_df['local_authority'].isin([city_a, city_b])]
+    comp_summary = comp_df.groupby(['local_authority', 'co-benefit_type'])['sum'].sum().reset_index()
+    comp_summary['co-benefit_type'] = comp_summary['co-benefit_type'].str.replace('_', ' ').str.title()
+
+    fig_compare = px.bar(
+        comp_summary,
+        x='co-benefit_type',
+        y='sum',
+        color='local_authority',
+        barmode='group',
+        labels={'sum': 'Benefits (Million GBP)', 'co-benefit_type': 'Co-benefit Category'},
+        color_discrete_sequence=['#22c55e', '#16a34a']
+    )
+    fig_compare.update_layout(height=400, legend=dict(title=''))
+    st.plotly_chart(fig_compare, width='stretch')
 
-# Comparison data
-comp_df = master_df[master_df['local_authority'].isin([city_a, city_b])]
-comp_summary = comp_df.groupby(['local_authority', 'co-benefit_type'])['sum'].sum().reset_index()
-comp_summary['co-benefit_type'] = comp_summary['co-benefit_type'].str.replace('_', ' ').str.title()
+    # Comparison metrics
+    city_a_total = comp_df[comp_df['local_authority']==city_a]['sum'].sum()
+    city_b_total = comp_df[comp_df['local_authority']==city_b]['sum'].sum()
 
-fig_compare = px.bar(
-    comp_summary,
-    x='co-benefit_type',
-    y='sum',
-    color='local_authority',
-    barmode='group',
-    labels={'sum': 'Benefits (Million GBP)', 'co-benefit_type': 'Co-benefit Category'},
-    color_discrete_sequence=['#22c55e', '#16a34a']
-)
-fig_compare.update_layout(height=400, legend=dict(title=''))
-st.plotly_chart(fig_compare, width='stretch')
-
-# Comparison metrics
-city_a_total = comp_df[comp_df['local_authority']==city_a]['sum'].sum()
-city_b_total = comp_df[comp_df['local_authority']==city_b]['sum'].sum()
-
-col_metric1, col_metric2, col_metric3 = st.columns(3)
-with col_metric1:
-    st.metric(f"{city_a}", f"£{city_a_total:.1f}M")
-with col_metric2:
-    st.metric(f"{city_b}", f"£{city_b_total:.1f}M")
-with col_metric3:
-    diff_pct = ((city_b_total/city_a_total - 1) * 100) if city_a_total > 0 else 0
-    direction = "higher" if diff_pct > 0 else "lower"
-    st.metric("Difference", f"{abs(diff_pct):.1f}%", 
-             delta=f"{city_b} {direction}")
+    col_metric1, col_metric2, col_metric3 = st.columns(3)
+    with col_metric1:
+        st.metric(f"{city_a}", f"£{city_a_total:.1f}M")
+    with col_metric2:
+        st.metric(f"{city_b}", f"£{city_b_total:.1f}M")
+    with col_metric3:
+        diff_pct = ((city_b_total/city_a_total - 1) * 100) if city_a_total > 0 else 0
+        direction = "higher" if diff_pct > 0 else "lower"
+        st.metric("Difference", f"{abs(diff_pct):.1f}%", 
+                 delta=f"{city_b} {direction}")
+
+render_city_comparison()
+
+# === SECTION 6: AD-HOC EXPLORER ===
+st.markdown("## 🧪 Ad-hoc Explorer")
+
+st.markdown("""
+<p class="story-text">
+Combine filters freely to explore any slice of small areas. In approximate mode, results are estimated instantly
+from a stratified sample of small areas and replaced by the exact figure as soon as it has been computed.
+</p>
+""", unsafe_allow_html=True)
+
+area_sample = get_stratified_sample(master_df)
+pop_min, pop_max = area_sample['population_range']
+
+def render_slice_estimate(estimate, margin, status):
+    st.metric("Total Benefits (estimate)", f"£{estimate:,.1f}M", delta=f"± £{margin:,.1f}M (95% CI)",
+              delta_color='off')
+    st.caption(
+        f"Estimated from {len(area_sample['areas']):,} sampled small areas across "
+        f"{len(area_sample['strata']):,} nation × local authority strata. {status}"
+    )
+
+def render_slice_exact(exact, estimate, margin):
+    st.metric("Total Benefits (exact)", f"£{exact:,.1f}M")
+    error_pct = (estimate / exact - 1) * 100 if exact else 0
+    st.caption(f"The sampled estimate was £{estimate:,.1f}M ± {margin:,.1f}M ({error_pct:+.1f}% from exact).")
+
+@st.fragment(run_every=EXACT_POLL_SECONDS)
+def render_slice_pending(future, estimate, margin):
+    """Show the estimate and poll the background exact computation without blocking the run"""
+    if future.done():
+        # The full run redraws the explorer with the exact total and without this fragment,
+        # which also cancels its timer
+        st.rerun()
+    render_slice_estimate(estimate, margin, "Computing the exact total…")
+
+@st.fragment
+def render_adhoc_explorer():
+    col_adhoc1, col_adhoc2, col_adhoc3 = st.columns(3)
+    with col_adhoc1:
+        adhoc_nations = st.multiselect("Nations:", place_aggregates['nation'].index.tolist(), key='adhoc_nations')
+        adhoc_las = st.multiselect("Local Authorities:", cities, key='adhoc_las')
+    with col_adhoc2:
+        adhoc_categories = st.multiselect(
+            "Benefit Categories:",
+            options=[c for c in benefit_categories.values() if c],
+            format_func=lambda c: c.replace('_', ' ').title(),
+            key='adhoc_categories'
+        )
+        adhoc_damage = st.radio("Damage Type:", ['All', 'health', 'non-health'], horizontal=True, key='adhoc_damage')
+    with col_adhoc3:
+        adhoc_years = st.slider("Years:", min_value=2025, max_value=2050, value=(2025, 2050), key='adhoc_years')
+        adhoc_population = st.slider(
+            "Small-area Population:",
+            min_value=pop_min, max_value=pop_max, value=(pop_min, pop_max),
+            key='adhoc_population'
+        )
+
+    approximate_mode = st.toggle("Approximate mode (instant estimate, exact result in background)", value=True)
+
+    adhoc_filters = {
+        'nations': tuple(sorted(adhoc_nations)),
+        'local_authorities': tuple(sorted(adhoc_las)),
+        'categories': tuple(sorted(adhoc_categories)),
+        'damage_type': None if adhoc_damage == 'All' else adhoc_damage,
+        'years': tuple(adhoc_years),
+        'population': None if adhoc_population == (pop_min, pop_max) else tuple(adhoc_population),
+    }
+
+    if approximate_mode:
+        adhoc_estimate, adhoc_margin = estimate_slice(area_sample, adhoc_filters)
+        adhoc_future = submit_exact_slice(master_df, adhoc_filters)
+        if adhoc_future.done():
+            render_slice_exact(adhoc_future.result(), adhoc_estimate, adhoc_margin)
+        else:
+            render_slice_pending(adhoc_future, adhoc_estimate, adhoc_margin)
+    else:
+        st.metric("Total Benefits (exact)", f"£{compute_exact_slice(master_df, adhoc_filters):,.1f}M")
+
+render_adhoc_explorer()
 
 # === STORY MODE / INSIGHTS SECTION ===
 st.markdown("## 📖 Key Findings & Policy Implications")
@@ -0,0 +1,397 @@
+"""Load-test harness for the co-benefits dashboard.
+
+Starts app.py on a local Streamlit server and drives many headless sessions
+over the same websocket protocol the browser uses. Each simulated user waits
+a random think-time, then changes the benefit category, moves the year
+slider, picks a comparison city or pans the folium map. The harness reports
+rerun latency percentiles, server memory per session and throughput at each
+concurrency level.
+
+Everything runs offline: the LAD GeoJSON is replaced by a generated stand-in
+with one square per local authority in lookups.csv.
+
+Usage:
+    python loadtest.py --concurrency 1 5 10 20 --duration 60 --seed 42
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+import warnings
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+try:
+    from websockets.sync.client import connect
+except ImportError:  # websockets ships with recent Streamlit releases
+    sys.exit("loadtest.py needs the 'websockets' package: pip install websockets")
+
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.Selectbox_pb2 import Selectbox
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+# Sessions are long-lived and closed explicitly, so the sync client isn't used as a context manager
+warnings.filterwarnings('ignore', message=r'connect\(\) must be used as a context manager')
+
+CATEGORY_LABEL = "Select Benefit Category:"
+YEAR_LABEL = "Select Year:"
+CITY_LABELS = ["Choose First City:", "Choose Second City:"]
+
+# Relative frequency of each user action
+ACTIONS = {
+    'category': 0.25,
+    'year': 0.40,
+    'city': 0.20,
+    'map_pan': 0.15,
+}
+
+# script_finished statuses that mark a completed rerun
+FINISHED_OK = {ForwardMsg.FINISHED_SUCCESSFULLY, ForwardMsg.FINISHED_FRAGMENT_RUN_SUCCESSFULLY}
+
+# Newer Streamlit releases identify the selected option by its label, older ones by index
+SELECTBOX_SENDS_LABEL = 'raw_value' in Selectbox.DESCRIPTOR.fields_by_name
+
+
+# --- OFFLINE GEOJSON STAND-IN ---
+def make_standin_geojson(app_dir, out_path):
+    """Write a GeoJSON with one square per local authority, keyed like the real LAD13NM file"""
+    lk = pd.read_csv(app_dir / 'lookups.csv', sep=None, engine='python', encoding='utf-8')
+    lk.columns = lk.columns.str.replace('^\ufeff', '', regex=True).str.strip()
+    names = sorted(lk['local_authority'].dropna().unique())
+
+    side = int(np.ceil(np.sqrt(len(names))))
+    cell_lng, cell_lat = 8.0 / side, 10.0 / side
+    features = []
+    for i, name in enumerate(names):
+        lng = -6.0 + (i % side) * cell_lng
+        lat = 50.0 + (i // side) * cell_lat
+        ring = [[lng, lat], [lng + cell_lng, lat], [lng + cell_lng, lat + cell_lat], [lng, lat + cell_lat], [lng, lat]]
+        features.append({
+            'type': 'Feature',
+            'properties': {'LAD13NM': name},
+            'geometry': {'type': 'Polygon', 'coordinates': [ring]},
+        })
+
+    with open(out_path, 'w', encoding='utf-8') as f:
+        json.dump({'type': 'FeatureCollection', 'features': features}, f)
+
+
+# --- SERVER ---
+def start_server(app_path, port, geojson_path):
+    """Run the app on a headless local Streamlit server and wait until it is healthy"""
+    env = dict(os.environ, GEOJSON_URL=str(geojson_path))
+    server = subprocess.Popen(
+        [
+            sys.executable, '-m', 'streamlit', 'run', app_path.name,
+            '--server.headless', 'true',
+            '--server.port', str(port),
+            '--server.enableXsrfProtection', 'false',
+            '--server.fileWatcherType', 'none',
+            '--browser.gatherUsageStats', 'false',
+        ],
+        cwd=app_path.parent, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f'http://localhost:{port}/_stcore/health', timeout=1) as response:
+                if response.status == 200:
+                    return server
+        except OSError:
+            time.sleep(0.25)
+    server.terminate()
+    raise RuntimeError(f"Streamlit server did not become healthy on port {port}")
+
+def server_rss_mb(pid):
+    """Resident memory of the server process in MB"""
+    try:
+        import psutil
+        return psutil.Process(pid).memory_info().rss / 2**20
+    except ImportError:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    return float('nan')
+
+
+# --- HEADLESS SESSION ---
+class DashboardSession:
+    """One simulated browser tab: a websocket, the widgets it has seen and their current values"""
+
+    def __init__(self, url, rng):
+        self.ws = connect(url, subprotocols=['streamlit'], max_size=None, open_timeout=30)
+        self.rng = rng
+        self.widgets = {}  # label -> widget proto from the last rerun
+        self.map_id = None
+        self.states = {}  # widget id -> WidgetState sent on every rerun
+        self.fragments = {}  # widget id -> id of the st.fragment that rendered it
+        self.pending_fragment = ''
+
+    def close(self):
+        self.ws.close()
+
+    def rerun(self):
+        """Send the current widget states and block until the script (or fragment) run finishes"""
+        msg = BackMsg()
+        msg.rerun_script.query_string = ''
+        msg.rerun_script.page_script_hash = ''
+        msg.rerun_script.widget_states.widgets.extend(self.states.values())
+        # Like the browser, a widget inside a fragment only reruns that fragment
+        msg.rerun_script.fragment_id = self.pending_fragment
+
+        start = time.perf_counter()
+        self.ws.send(msg.SerializeToString())
+        received, errors = 0, 0
+        while True:
+            raw = self.ws.recv(timeout=300)
+            received += len(raw)
+            fwd = ForwardMsg()
+            fwd.ParseFromString(raw)
+            kind = fwd.WhichOneof('type')
+            if kind == 'delta' and fwd.delta.WhichOneof('type') == 'new_element':
+                errors += self._track_element(fwd.delta.new_element, fwd.delta.fragment_id)
+            elif kind == 'script_finished':
+                if fwd.script_finished in FINISHED_OK:
+                    return time.perf_counter() - start, received, errors
+                if fwd.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    return time.perf_counter() - start, received, errors + 1
+
+    def _track_element(self, element, fragment_id):
+        """Remember widgets we drive; returns 1 if the element is a rendered exception"""
+        kind = element.WhichOneof('type')
+        if kind == 'exception':
+            return 1
+        if kind in ('selectbox', 'slider'):
+            widget = getattr(element, kind)
+            self.widgets[widget.label] = widget
+            self.fragments[widget.id] = fragment_id
+        elif kind == 'component_instance' and 'st_folium' in element.component_instance.component_name:
+            self.map_id = element.component_instance.id
+            self.fragments[self.map_id] = fragment_id
+        return 0
+
+    def _set(self, widget_id, **value):
+        self.pending_fragment = self.fragments.get(widget_id, '')
+        state = self.states.setdefault(widget_id, WidgetState(id=widget_id))
+        field, v = next(iter(value.items()))
+        if field == 'double_array_value':
+            state.double_array_value.data[:] = v
+        else:
+            setattr(state, field, v)
+
+    def select(self, label, index):
+        """Choose option `index` in the selectbox labelled `label`; False if it isn't on the page"""
+        widget = self.widgets.get(label)
+        if widget is None or not widget.options:
+            return False
+        if SELECTBOX_SENDS_LABEL:
+            self._set(widget.id, string_value=widget.options[index])
+        else:
+            self._set(widget.id, int_value=index)
+        return True
+
+    def slide(self, label, value):
+        """Move the single-value slider labelled `label`; False if it isn't on the page"""
+        slider = self.widgets.get(label)
+        if slider is None:
+            return False
+        self._set(slider.id, double_array_value=[value])
+        return True
+
+    def _pick_option(self, label):
+        widget = self.widgets.get(label)
+        return widget is not None and self.select(label, self.rng.randrange(max(len(widget.options), 1)))
+
+    def act(self):
+        """Apply one random user action to the widget states; False if the widget isn't on the page"""
+        action = self.rng.choices(list(ACTIONS), weights=list(ACTIONS.values()))[0]
+        if action == 'category':
+            return action, self._pick_option(CATEGORY_LABEL)
+        if action == 'city':
+            return action, self._pick_option(self.rng.choice(CITY_LABELS))
+        if action == 'year':
+            slider = self.widgets.get(YEAR_LABEL)
+            if slider is None:
+                return action, False
+            return action, self.slide(YEAR_LABEL, self.rng.randint(int(slider.min), int(slider.max)))
+
+        # map_pan: the st_folium component reports its new view state back, triggering a rerun
+        if self.map_id is None:
+            return action, False
+        view = {
+            'last_clicked': None,
+            'bounds': None,
+            'zoom': self.rng.randint(5, 9),
+            'center': {'lat': 54.5 + self.rng.uniform(-3, 3), 'lng': -2 + self.rng.uniform(-3, 3)},
+        }
+        self._set(self.map_id, json_value=json.dumps(view))
+        return action, True
+
+
+def run_session(url, seed, think_time, stop, results):
+    """Session loop: initial page load, then think / act / rerun until told to stop"""
+    rng = random.Random(seed)
+    session = DashboardSession(url, rng)
+    try:
+        latency, received, errors = session.rerun()
+        results.append({'action': 'load', 'latency': latency, 'bytes': received, 'errors': errors,
+                        'finished': time.perf_counter()})
+        while not stop.is_set():
+            if stop.wait(rng.expovariate(1 / think_time)):
+                break
+            action, ok = session.act()
+            if not ok:
+                continue
+            latency, received, errors = session.rerun()
+            results.append({'action': action, 'latency': latency, 'bytes': received, 'errors': errors,
+                            'finished': time.perf_counter()})
+    except Exception as e:
+        results.append({'action': 'failed', 'latency': float('nan'), 'bytes': 0, 'errors': 1,
+                        'finished': time.perf_counter(), 'detail': repr(e)})
+    finally:
+        session.close()
+
+
+# --- LOAD LEVELS ---
+def prewarm_caches(url, seed):
+    """Render every category x year map view once so cached aggregates don't count as session memory"""
+    session = DashboardSession(url, random.Random(seed))
+    try:
+        session.rerun()
+        category, year = session.widgets[CATEGORY_LABEL], session.widgets[YEAR_LABEL]
+        for index in range(len(category.options)):
+            session.select(CATEGORY_LABEL, index)
+            session.rerun()
+            for value in range(int(year.min), int(year.max) + 1):
+                session.slide(YEAR_LABEL, value)
+                session.rerun()
+    finally:
+        session.close()
+
+
+def run_level(url, server_pid, concurrency, duration, think_time, ramp_up, seed):
+    """Run `concurrency` sessions for `duration` seconds and summarise the reruns they produced"""
+    # Sessions from the previous level are closed by now, so this is this level's own baseline
+    rss_before = server_rss_mb(server_pid)
+
+    stop = threading.Event()
+    results = []
+    threads = []
+    window_start = time.perf_counter()
+    for i in range(concurrency):
+        thread = threading.Thread(
+            target=run_session,
+            args=(url, seed * 10_000 + i, think_time, stop, results),
+            daemon=True
+        )
+        thread.start()
+        threads.append(thread)
+        time.sleep(ramp_up / max(concurrency, 1))
+
+    stop.wait(duration)
+    rss_loaded = server_rss_mb(server_pid)
+    stop.set()
+    window_end = time.perf_counter()
+    for thread in threads:
+        thread.join(timeout=300)
+    time.sleep(1)
+    rss_after = server_rss_mb(server_pid)
+
+    # Reruns still in flight when the clock stopped are left out of every figure
+    reruns = pd.DataFrame(results)
+    reruns = reruns[reruns['finished'] <= window_end]
+    interactions = reruns[~reruns['action'].isin(['load', 'failed'])]
+    latencies = interactions['latency'].dropna().to_numpy() * 1000
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if len(latencies) else (np.nan,) * 3
+    load_ms = reruns.loc[reruns['action'] == 'load', 'latency'].median() * 1000
+
+    return {
+        'concurrency': concurrency,
+        'reruns': len(interactions),
+        'throughput_rps': len(interactions) / (window_end - window_start),
+        'p50_ms': p50,
+        'p95_ms': p95,
+        'p99_ms': p99,
+        'page_load_p50_ms': load_ms,
+        'kb_per_rerun': interactions['bytes'].mean() / 1024 if len(interactions) else np.nan,
+        'errors': int(reruns['errors'].sum()),
+        'server_rss_mb': rss_loaded,
+        'mb_per_session': (rss_loaded - rss_before) / concurrency,
+        'retained_mb': rss_after - rss_before,
+        'p50_ms_by_action': (interactions.groupby('action')['latency'].median() * 1000).to_dict(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--app', default=Path(__file__).with_name('app.py'), type=Path,
+                        help="Streamlit script to test (data files are read from its directory)")
+    parser.add_argument('--port', default=8599, type=int)
+    parser.add_argument('--concurrency', default=[1, 5, 10, 20], type=int, nargs='+',
+                        help="Concurrent sessions for each load level")
+    parser.add_argument('--duration', default=60.0, type=float, help="Seconds per load level")
+    parser.add_argument('--think-time', default=3.0, type=float, help="Mean think-time between actions (s)")
+    parser.add_argument('--ramp-up', default=5.0, type=float, help="Seconds over which sessions are started")
+    parser.add_argument('--seed', default=42, type=int)
+    parser.add_argument('--no-prewarm', dest='prewarm', action='store_false',
+                        help="Skip rendering every category x year view before measuring")
+    parser.add_argument('--json', type=Path, help="Also write the summary to this JSON file")
+    args = parser.parse_args()
+
+    app_path = args.app.resolve()
+    with tempfile.TemporaryDirectory() as tmp:
+        geojson_path = Path(tmp) / 'lad_standin.geojson'
+        make_standin_geojson(app_path.parent, geojson_path)
+
+        server = start_server(app_path, args.port, geojson_path)
+        url = f'ws://localhost:{args.port}/_stcore/stream'
+        try:
+            # Warm the data caches with a single session so the first level isn't dominated by CSV loading
+            warmup = DashboardSession(url, random.Random(args.seed))
+            warmup_s = warmup.rerun()[0]
+            warmup.close()
+            print(f"Cold start: {warmup_s:.1f}s, server RSS: {server_rss_mb(server.pid):.0f} MB", flush=True)
+
+            if args.prewarm:
+                started = time.perf_counter()
+                prewarm_caches(url, args.seed)
+                time.sleep(1)
+                print(f"Pre-warmed map caches in {time.perf_counter() - started:.0f}s, "
+                      f"server RSS: {server_rss_mb(server.pid):.0f} MB", flush=True)
+
+            summary = []
+            for level, concurrency in enumerate(args.concurrency):
+                row = run_level(url, server.pid, concurrency, args.duration, args.think_time,
+                                args.ramp_up, args.seed + level)
+                summary.append(row)
+                print(
+                    f"{row['concurrency']:>4} sessions | {row['reruns']:>5} reruns | "
+                    f"{row['throughput_rps']:6.2f} reruns/s | p50 {row['p50_ms']:7.0f} ms | "
+                    f"p95 {row['p95_ms']:7.0f} ms | p99 {row['p99_ms']:7.0f} ms | "
+                    f"load {row['page_load_p50_ms']:7.0f} ms | {row['kb_per_rerun']:7.0f} KB/rerun | "
+                    f"{row['mb_per_session']:6.1f} MB/session | {row['retained_mb']:+6.1f} MB retained | "
+                    f"{row['errors']} errors",
+                    flush=True
+                )
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+    if args.json:
+        args.json.write_text(json.dumps(summary, indent=2, default=float))
+
+
+if __name__ == '__main__':
+    main()